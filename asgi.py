@@ -0,0 +1,411 @@
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import jsonify, request
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import (
+    SEARCH_PAGE_SIZE,
+    Dosen,
+    Kelas,
+    Kelas_Ampu_Detail,
+    Mahasiswa,
+    Mata_Kuliah,
+    conditional,
+    course_fields,
+    create_app,
+    identity_cache,
+    lecturer_fields,
+    lookup_keys,
+    lookup_query,
+    lookup_response,
+    lookup_rows,
+    page_query,
+    page_response,
+    page_rows,
+    reference_cache,
+    reference_fields,
+    registry_query,
+    registry_to_dict,
+    requested_fields,
+    roster_query,
+    row_serializer,
+    schedule_field_names,
+    schedule_query,
+    search_request,
+    select_fields,
+    serialize_schedules,
+    student_fields,
+    wants_stream,
+)
+from handoff import Cancelled, Handoff
+
+# ASYNC SERVING
+# ASGI entry point, e.g. uvicorn asgi:app --workers 4 (needs asyncpg). The read
+# routes of the collections (courses, students, lecturers, schedules, registry and
+# search) run on the event loop with an asyncpg engine, awaiting the auth lookup
+# and their queries, so thousands of open connections cost no thread each. Every
+# other request (writes, streams, exports) goes to the Flask app in a thread pool.
+# The async routes reuse the query builders and serializers of app.py inside a
+# Flask request context, with the same before/after request hooks and errors.
+
+# the Flask app of the sync routes, the request contexts and the error handlers
+flask_app = create_app()
+
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+# the URL of the database of the Flask app with its async driver
+def async_url(url):
+    url = make_url(url)
+    drivername = ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)
+    return url.set(drivername=drivername)
+
+
+# ASYNC_DATABASE_URL may point the async routes elsewhere (e.g. at a pgbouncer)
+database_url = os.environ.get("ASYNC_DATABASE_URL") or async_url(
+    flask_app.config["SQLALCHEMY_DATABASE_URI"]
+)
+engine_options = {}
+if make_url(database_url).get_backend_name() == "postgresql":
+    # requests wait for one of these connections instead of opening their own
+    engine_options = {
+        "pool_size": int(os.environ.get("ASYNC_POOL_SIZE", 20)),
+        "max_overflow": int(os.environ.get("ASYNC_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(os.environ.get("ASYNC_POOL_TIMEOUT", 30)),
+    }
+engine = create_async_engine(database_url, **engine_options)
+Session = async_sessionmaker(engine, expire_on_commit=False)
+
+# threads running the requests handed to the Flask app
+WSGI_THREADS = int(os.environ.get("WSGI_THREADS", 32))
+executor = ThreadPoolExecutor(WSGI_THREADS, thread_name_prefix="wsgi")
+
+# at most QUEUE_SIZE body chunks of a Flask response wait for a slow client
+QUEUE_SIZE = 16
+
+# returned by an async route to leave the request to the Flask app
+SYNC = object()
+
+
+# QUERIES
+async def fetch(session, query):
+    return (await session.execute(query.statement)).all()
+
+
+# read the rows of the schedules missing from reference_cache on the event loop,
+# where its read-through would block, before serialize_schedules() looks them up
+async def fill_reference_cache(session, rows, names):
+    for name, (_, table, _) in reference_fields.items():
+        if name not in names:
+            continue
+        keys = reference_cache.missing(table, [getattr(row, name) for row in rows])
+        if keys:
+            version = reference_cache.versions[table]
+            found = await session.execute(reference_cache.query(table, keys))
+            reference_cache.store(table, found.all(), version)
+
+
+# paginate() of app.py with the query awaited
+async def paginate(session, query, *keys, default_limit=None):
+    query, limit = page_query(query, keys, default_limit)
+    return page_rows(await fetch(session, query), keys, limit)
+
+
+# lookup() of app.py with the query awaited
+async def lookup(session, query, key, keys):
+    return lookup_rows(await fetch(session, lookup_query(query, key, keys)), key, keys)
+
+
+async def resolve_role(session, id):
+    if await session.get(Mahasiswa, id):
+        return "mahasiswa"
+    if await session.get(Dosen, id):
+        return "dosen"
+
+
+# login() of app.py with the role lookup awaited on a cache miss
+async def login(session):
+    id = request.authorization.get("username")
+    found, role, generation = identity_cache.lookup(id)
+    if not found:
+        role = await resolve_role(session, id)
+        identity_cache.store(id, role, generation)
+    return role
+
+
+# ROUTES
+# GET routes served on the event loop, by path
+routes = {}
+
+
+def route(path):
+    def decorator(handler):
+        routes[path] = handler
+        return handler
+
+    return decorator
+
+
+@route("/courses")
+@conditional("mata_kuliah")
+async def get_courses(session):
+    names = requested_fields(course_fields)
+    query = select_fields(course_fields, names, Mata_Kuliah.kode_mk)
+    serialize = row_serializer("course", tuple(names))
+    keys = lookup_keys("kode", Mata_Kuliah.kode_mk)
+    if keys is not None:
+        courses, missing = await lookup(session, query, Mata_Kuliah.kode_mk, keys)
+        return lookup_response([serialize(matkul) for matkul in courses], missing)
+    courses, next_cursor = await paginate(session, query, Mata_Kuliah.kode_mk)
+    res = [serialize(matkul) for matkul in courses]
+    return page_response(res, next_cursor)
+
+
+@route("/students")
+async def get_students(session):
+    if await login(session) == "mahasiswa":
+        if wants_stream():
+            return SYNC
+        names = requested_fields(student_fields)
+        query = select_fields(student_fields, names, Mahasiswa.nim)
+        serialize = row_serializer("student", tuple(names))
+        keys = lookup_keys("nim", Mahasiswa.nim)
+        if keys is not None:
+            students, missing = await lookup(session, query, Mahasiswa.nim, keys)
+            return lookup_response([serialize(mhs) for mhs in students], missing)
+        students, next_cursor = await paginate(session, query, Mahasiswa.nim)
+        res = [serialize(mahasiswa) for mahasiswa in students]
+        return page_response(res, next_cursor)
+    return {"message": "Unauthorized access"}, 401
+
+
+@route("/lecturers")
+async def get_lecturers(session):
+    if await login(session) == "dosen":
+        if wants_stream():
+            return SYNC
+        names = requested_fields(lecturer_fields)
+        query = select_fields(lecturer_fields, names, Dosen.nip)
+        serialize = row_serializer("lecturer", tuple(names))
+        keys = lookup_keys("nip", Dosen.nip)
+        if keys is not None:
+            lecturers, missing = await lookup(session, query, Dosen.nip, keys)
+            return lookup_response([serialize(dosen) for dosen in lecturers], missing)
+        lecturers, next_cursor = await paginate(session, query, Dosen.nip)
+        res = [serialize(dosen) for dosen in lecturers]
+        return page_response(res, next_cursor)
+    return {"message": "Unauthorized access"}, 401
+
+
+@route("/schedules")
+@conditional("kelas", "kelas_ampu", "mata_kuliah", "dosen", "mahasiswa")
+async def get_schedules(session):
+    names = schedule_field_names()
+    cached = reference_cache.ready()
+    query = schedule_query(names, Kelas.kode_kelas, cached=cached)
+    keys = lookup_keys("kode_kelas", Kelas.kode_kelas)
+    if keys is not None:
+        rows, missing = await lookup(session, query, Kelas.kode_kelas, keys)
+    else:
+        rows, next_cursor = await paginate(session, query, Kelas.kode_kelas)
+    ampu_rows = None
+    if "list_mahasiswa" in names and rows:
+        kode_kelas = [row.kode_kelas for row in rows]
+        ampu_rows = await fetch(session, roster_query(kode_kelas))
+    if cached:
+        await fill_reference_cache(session, rows, names)
+    res = serialize_schedules(rows, names, ampu_rows, cached, read_through=False)
+    if keys is not None:
+        return lookup_response(res, missing)
+    return page_response(res, next_cursor)
+
+
+@route("/regs")
+async def get_reg(session):
+    if wants_stream():
+        return SYNC
+    rows, next_cursor = await paginate(
+        session,
+        registry_query(),
+        Kelas_Ampu_Detail.kode_kelas,
+        Kelas_Ampu_Detail.nim,
+    )
+    result = [registry_to_dict(row) for row in rows]
+    return page_response(result, next_cursor)
+
+
+@route("/search")
+async def search(session):
+    role = await login(session) if request.authorization else None
+    hits_query, error = search_request(role)
+    if error:
+        return error
+
+    query, keys = hits_query
+    hits, next_cursor = await paginate(
+        session, query, *keys, default_limit=SEARCH_PAGE_SIZE
+    )
+    res = [dict(hit._mapping) for hit in hits]
+    return jsonify({"data": res, "next": next_cursor})
+
+
+# ASGI
+# the WSGI environ of an ASGI request, for the Flask request context
+def wsgi_environ(scope, body):
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = f"HTTP_{name}"
+        if name in environ:
+            # a repeated header is one comma separated list, except for cookies
+            separator = "; " if name == "HTTP_COOKIE" else ","
+            value = f"{environ[name]}{separator}{value}"
+        environ[name] = value
+    return environ
+
+
+async def read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return bytes(body)
+
+
+# run an async route like Flask runs a view: before request hooks, the route, the
+# error handlers and after request hooks, returns None for SYNC
+async def dispatch(handler, environ):
+    with flask_app.request_context(environ):
+        try:
+            try:
+                rv = flask_app.preprocess_request()
+                if rv is None:
+                    async with Session() as session:
+                        rv = await handler(session)
+                    if rv is SYNC:
+                        return None
+            except Exception as error:
+                rv = flask_app.handle_user_exception(error)
+            return flask_app.finalize_request(rv)
+        except Exception as error:
+            return flask_app.handle_exception(error)
+
+
+async def send_response(response, send):
+    headers = [
+        (name.lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in response.headers.items()
+    ]
+    status = response.status_code
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": response.get_data()})
+
+
+BODY = {"type": "http.response.body"}
+
+
+# run the Flask app in a thread of the pool, its response is passed on chunk by
+# chunk so that streams and exports keep their bounded memory
+async def call_wsgi(environ, send):
+    loop = asyncio.get_running_loop()
+    messages = asyncio.Queue()
+
+    def deliver(message):
+        loop.call_soon_threadsafe(messages.put_nowait, message)
+
+    handoff = Handoff(QUEUE_SIZE, deliver)
+    put = handoff.put
+
+    def start_response(status, headers, exc_info=None):
+        headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in headers
+        ]
+        start = {"type": "http.response.start", "headers": headers}
+        put({**start, "status": int(status.split(" ", 1)[0])})
+
+    def run():
+        try:
+            body = flask_app(environ, start_response)
+            try:
+                for chunk in body:
+                    if chunk:
+                        put({**BODY, "body": chunk, "more_body": True})
+            finally:
+                if hasattr(body, "close"):
+                    body.close()
+            put({**BODY, "body": b""})
+        except Cancelled:
+            pass
+        except Exception as error:
+            try:
+                put(error)
+            except Cancelled:
+                pass
+
+    future = loop.run_in_executor(executor, run)
+    try:
+        while True:
+            message = await messages.get()
+            handoff.taken()
+            if isinstance(message, Exception):
+                raise message
+            await send(message)
+            if message["type"] == BODY["type"] and not message.get("more_body"):
+                return
+    finally:
+        handoff.cancel()
+        await future
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await engine.dispose()
+            executor.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    environ = wsgi_environ(scope, await read_body(receive))
+    handler = routes.get(scope["path"]) if scope["method"] == "GET" else None
+    if handler is not None:
+        response = await dispatch(handler, environ)
+        if response is not None:
+            return await send_response(response, send)
+    await call_wsgi(environ, send)
@@ -0,0 +1,206 @@
+import argparse
+import json
+import sys
+
+from benchmark import (
+    concurrency,
+    datagen,
+    forks,
+    overbooking,
+    runner,
+    serialization,
+    statements,
+)
+
+# usage:
+#   python -m benchmark generate --scale 1
+#   python -m benchmark run --scale 1 --concurrency 8 --out before.json
+#   python -m benchmark compare before.json after.json
+#   python -m benchmark serialization --rows 100000
+#   python -m benchmark concurrency --base-url http://127.0.0.1:5000 --out sync.json
+#   python -m benchmark concurrency --base-url http://127.0.0.1:8000 --out asgi.json
+#   python -m benchmark compare sync.json asgi.json
+#   python -m benchmark forks --workers 4
+#   python -m benchmark statements --scales 0.1 0.5
+#   python -m benchmark overbooking --kapasitas 50 --threads 32
+#
+# the checks (forks, statements, overbooking) exit with status 1 when they fail,
+# statements replaces the data like generate does
+#
+# the database comes from DATABASE_URL (or USER_NAME and PASSWORD) like the app
+
+
+def load_app():
+    import app
+
+    return app
+
+
+def generate(args):
+    counts = datagen.load(load_app(), args.scale, args.seed, args.create)
+    json.dump(counts, sys.stdout, indent=2)
+    print()
+
+
+def run(args):
+    report = runner.run(
+        args.scale,
+        scenarios=args.scenarios,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        seed=args.seed,
+        app_module=None if args.base_url else load_app(),
+        base_url=args.base_url,
+    )
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as file:
+            file.write(output + "\n")
+    print(output)
+
+
+def compare(args):
+    reports = []
+    for path in (args.before, args.after):
+        with open(path) as file:
+            reports.append(json.load(file))
+    if all("levels" in report for report in reports):
+        json.dump(concurrency.compare(*reports), sys.stdout, indent=2)
+    else:
+        json.dump(runner.compare(*reports), sys.stdout, indent=2)
+    print()
+
+
+def serialize(args):
+    report = serialization.run(load_app(), args.rows, args.repeat)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+def capacity(args):
+    report = concurrency.run(
+        args.base_url,
+        args.scale,
+        scenario=args.scenario,
+        levels=args.levels,
+        duration=args.duration,
+        timeout=args.timeout,
+        seed=args.seed,
+        max_error_rate=args.max_error_rate,
+        max_p99_ms=args.max_p99_ms,
+    )
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as file:
+            file.write(output + "\n")
+    print(output)
+
+
+def check_forks(args):
+    report = forks.run(load_app(), args.workers, args.timeout)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    if not report["ok"]:
+        sys.exit(1)
+
+
+def check_statements(args):
+    report = statements.run(load_app(), args.scales, args.seed, args.create)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    if not report["ok"]:
+        sys.exit(1)
+
+
+def check_overbooking(args):
+    report = overbooking.run(load_app(), args.kapasitas, args.threads, args.base_url)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    if not report["ok"]:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmark")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("generate", help="fill the database")
+    command.add_argument("--scale", type=float, default=1)
+    command.add_argument("--seed", type=int, default=0)
+    command.add_argument(
+        "--create", action="store_true", help="create the tables (not on Postgres)"
+    )
+    command.set_defaults(handler=generate)
+
+    command = commands.add_parser("run", help="run the scenarios")
+    command.add_argument("--scale", type=float, default=1)
+    command.add_argument("--seed", type=int, default=0)
+    command.add_argument("--requests", type=int, default=200)
+    command.add_argument("--concurrency", type=int, default=4)
+    command.add_argument(
+        "--scenarios", nargs="+", choices=list(runner.SCENARIOS), default=None
+    )
+    command.add_argument("--base-url", help="run against a server instead")
+    command.add_argument("--out", help="write the JSON report to a file")
+    command.set_defaults(handler=run)
+
+    command = commands.add_parser("compare", help="compare two reports")
+    command.add_argument("before")
+    command.add_argument("after")
+    command.set_defaults(handler=compare)
+
+    command = commands.add_parser(
+        "serialization", help="measure the encoding of registry rows"
+    )
+    command.add_argument("--rows", type=int, default=100000)
+    command.add_argument("--repeat", type=int, default=3)
+    command.set_defaults(handler=serialize)
+
+    command = commands.add_parser(
+        "concurrency", help="measure the concurrent clients a server keeps up with"
+    )
+    command.add_argument("--base-url", required=True)
+    command.add_argument("--scale", type=float, default=1)
+    command.add_argument("--seed", type=int, default=0)
+    command.add_argument(
+        "--scenario", choices=concurrency.READ_SCENARIOS, default="courses"
+    )
+    command.add_argument("--levels", type=int, nargs="+", default=[10, 100, 1000])
+    command.add_argument("--duration", type=float, default=10, help="seconds")
+    command.add_argument("--timeout", type=float, default=30, help="seconds")
+    command.add_argument("--max-error-rate", type=float, default=0.01)
+    command.add_argument("--max-p99-ms", type=float)
+    command.add_argument("--out", help="write the JSON report to a file")
+    command.set_defaults(handler=capacity)
+
+    command = commands.add_parser(
+        "forks", help="check that forked workers never share a connection"
+    )
+    command.add_argument("--workers", type=int, default=4)
+    command.add_argument("--timeout", type=float, default=30, help="seconds")
+    command.set_defaults(handler=check_forks)
+
+    command = commands.add_parser(
+        "statements", help="check that reads run as many statements at any scale"
+    )
+    command.add_argument("--scales", type=float, nargs="+", default=[0.1, 0.5])
+    command.add_argument("--seed", type=int, default=0)
+    command.add_argument(
+        "--create", action="store_true", help="create the tables (not on Postgres)"
+    )
+    command.set_defaults(handler=check_statements)
+
+    command = commands.add_parser(
+        "overbooking", help="check that concurrent enrollments never overbook"
+    )
+    command.add_argument("--kapasitas", type=int, default=50)
+    command.add_argument("--threads", type=int, default=32)
+    command.add_argument("--base-url", help="run against a server instead")
+    command.set_defaults(handler=check_overbooking)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import asyncio
+import datetime
+import time
+import urllib.parse
+
+from benchmark import datagen, runner
+
+# CONCURRENT CONNECTIONS
+# how many clients a running server keeps up with: at each level that many clients
+# hold a keep-alive connection each and send the requests of a read-only scenario
+# back to back for a while. The clients share one asyncio loop, so the client side
+# needs no thread per connection. Run it against the sync server (python app.py)
+# and the ASGI server (uvicorn asgi:app) and compare the capacities.
+
+# the scenarios that leave the dataset unchanged and can be repeated at will
+READ_SCENARIOS = ["courses", "schedules", "regs", "search", "students", "lookup"]
+
+CONNECTION_ERRORS = (OSError, EOFError, ValueError, asyncio.TimeoutError)
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+        self.errors = {}
+        # clients that completed at least one request
+        self.served = set()
+
+    def record(self, client, endpoint, status, elapsed):
+        self.latencies.setdefault(endpoint, []).append(elapsed)
+        counts = self.statuses.setdefault(endpoint, {})
+        counts[status] = counts.get(status, 0) + 1
+        self.served.add(client)
+
+    def error(self, error):
+        name = type(error).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+
+# send one request on an open connection, returns the status and whether the server
+# closes the connection after the response
+async def send(reader, writer, host, method, path, headers):
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise EOFError("connection closed by the server")
+    version, status = status_line.decode("latin-1").split()[:2]
+    length, chunked, close = None, False, version == "HTTP/1.0"
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding":
+            chunked = "chunked" in value
+        elif name == "connection":
+            close = value == "close"
+
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length is not None:
+        await reader.readexactly(length)
+    else:
+        await reader.read()
+        close = True
+    return int(status), close
+
+
+async def client(index, url, scenario, n, seed, deadline, timeout, stats):
+    worker = runner.Worker(index, 1, seed)
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        for method, path, _, headers in scenario(worker, worker.rng, n):
+            endpoint = f"{method} {path.split('?')[0]}"
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(url.hostname, url.port), timeout
+                    )
+                start = time.perf_counter()
+                status, close = await asyncio.wait_for(
+                    send(reader, writer, url.netloc, method, path, headers), timeout
+                )
+                stats.record(index, endpoint, status, time.perf_counter() - start)
+            except CONNECTION_ERRORS as error:
+                stats.error(error)
+                close = True
+                # do not hammer a server that refuses connections
+                await asyncio.sleep(0.1)
+            if close and writer is not None:
+                writer.close()
+                reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_level(url, scenario, n, seed, clients, duration, timeout):
+    stats = Stats()
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(
+        *(
+            client(index, url, scenario, n, seed, deadline, timeout, stats)
+            for index in range(clients)
+        )
+    )
+    return stats, time.perf_counter() - start
+
+
+# run the levels one after the other, a level is within the capacity of the server
+# when every client was served and at most max_error_rate of the requests failed,
+# and the p99 latency stayed under max_p99_ms if given
+def run(
+    base_url,
+    scale,
+    scenario="courses",
+    levels=(10, 100, 1000),
+    duration=10,
+    timeout=30,
+    seed=0,
+    max_error_rate=0.01,
+    max_p99_ms=None,
+):
+    url = urllib.parse.urlsplit(base_url)
+    n = datagen.sizes(scale)
+    report = {
+        "meta": {
+            "base_url": base_url,
+            "scale": scale,
+            "scenario": scenario,
+            "duration_s": duration,
+            "seed": seed,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        },
+        "levels": {},
+        "capacity": 0,
+    }
+    for clients in levels:
+        stats, elapsed = asyncio.run(
+            run_level(
+                url, runner.SCENARIOS[scenario], n, seed, clients, duration, timeout
+            )
+        )
+        endpoints = runner.summarize(stats.latencies, stats.statuses, elapsed)
+        requests = sum(endpoint["requests"] for endpoint in endpoints.values())
+        failed = sum(stats.errors.values()) + sum(
+            endpoint["errors"] for endpoint in endpoints.values()
+        )
+        attempts = requests + sum(stats.errors.values())
+        p99 = max(
+            (endpoint["latency_ms"]["p99"] for endpoint in endpoints.values()),
+            default=None,
+        )
+        level = {
+            "clients_served": len(stats.served),
+            "requests": requests,
+            "throughput_rps": round(requests / elapsed, 2),
+            "error_rate": round(failed / attempts, 4) if attempts else None,
+            "connection_errors": stats.errors,
+            "p99_ms": p99,
+            "endpoints": endpoints,
+        }
+        report["levels"][str(clients)] = level
+        if (
+            level["clients_served"] == clients
+            and level["error_rate"] is not None
+            and level["error_rate"] <= max_error_rate
+            and (max_p99_ms is None or p99 <= max_p99_ms)
+        ):
+            report["capacity"] = max(report["capacity"], clients)
+    return report
+
+
+# the capacity and the throughput of every level of two reports side by side
+def compare(sync, asgi):
+    return {
+        "capacity": {"sync": sync["capacity"], "asgi": asgi["capacity"]},
+        "levels": {
+            clients: {
+                "sync_rps": sync["levels"][clients]["throughput_rps"],
+                "asgi_rps": level["throughput_rps"],
+                "sync_p99_ms": sync["levels"][clients]["p99_ms"],
+                "asgi_p99_ms": level["p99_ms"],
+                "sync_error_rate": sync["levels"][clients]["error_rate"],
+                "asgi_error_rate": level["error_rate"],
+            }
+            for clients, level in asgi["levels"].items()
+            if clients in sync["levels"]
+        },
+    }
@@ -0,0 +1,194 @@
+import datetime
+import random
+
+from sqlalchemy import delete, insert, text
+
+# SYNTHETIC DATASET
+# deterministic data at a scale factor, SF1 is 1k students and SF100 100k students
+#
+# classes fill a grid of rooms x 25 weekly slots (5 days x 5 start times, two hours
+# apart), every lecturer teaches one day in one room and every student takes classes
+# in distinct slots, so the dataset is free of timetable conflicts. The last slot of
+# the week is left free so that benchmark enrollments never clash either.
+
+DAYS = ("Senin", "Selasa", "Rabu", "Kamis", "Jumat")
+TIMES = tuple(datetime.time(hour) for hour in (7, 9, 11, 13, 15))
+SLOTS = [(day, jam) for day in DAYS for jam in TIMES]
+FREE_SLOT = len(SLOTS) - 1
+
+CLASSES_PER_STUDENT = 6
+CHUNK_SIZE = 5000
+
+
+def sizes(scale):
+    rooms = max(1, round(8 * scale))
+    return {
+        "mahasiswa": max(1, round(1000 * scale)),
+        "dosen": rooms * len(DAYS),
+        "mata_kuliah": max(1, round(100 * scale)),
+        "kelas": rooms * len(SLOTS),
+        "rooms": rooms,
+    }
+
+
+def nim(index):
+    return f"M{index:07d}"
+
+
+def nip(index):
+    return f"D{index:06d}"
+
+
+def kode_mk(index):
+    return f"MK{index:05d}"
+
+
+def room(index):
+    return f"R{index:04d}"
+
+
+# kode_kelas of the class in a room and slot, kelas are inserted in that order
+def kode_kelas(room_index, slot_index):
+    return room_index * len(SLOTS) + slot_index + 1
+
+
+def generate(scale, seed=0):
+    rng = random.Random(seed)
+    n = sizes(scale)
+
+    courses = [
+        {
+            "kode_mk": kode_mk(i),
+            "nama_mk": f"Mata Kuliah {i}",
+            "sks": rng.choice((2, 3)),
+        }
+        for i in range(n["mata_kuliah"])
+    ]
+    lecturers = [
+        {
+            "nip": nip(i),
+            "nama_dosen": f"Dosen {i}",
+            "gender_dosen": rng.choice("LP"),
+            "telp_dosen": f"0811{i:08d}",
+            "email_dosen": f"dosen{i}@sia.test",
+        }
+        for i in range(n["dosen"])
+    ]
+    students = [
+        {
+            "nim": nim(i),
+            "nama_mhs": f"Mahasiswa {i}",
+            "gender_mhs": rng.choice("LP"),
+            "telp_mhs": f"0812{i:08d}",
+            "email_mhs": f"mhs{i}@sia.test",
+        }
+        for i in range(n["mahasiswa"])
+    ]
+
+    # every student takes classes in distinct slots, in any room
+    enrollments = []
+    enrolled = [0] * n["kelas"]
+    for i in range(n["mahasiswa"]):
+        for slot_index in rng.sample(range(FREE_SLOT), CLASSES_PER_STUDENT):
+            kode = kode_kelas(rng.randrange(n["rooms"]), slot_index)
+            enrollments.append({"kode_kelas": kode, "nim": nim(i)})
+            enrolled[kode - 1] += 1
+
+    classes = []
+    for room_index in range(n["rooms"]):
+        for slot_index, (hari, jam) in enumerate(SLOTS):
+            kode = kode_kelas(room_index, slot_index)
+            classes.append(
+                {
+                    "kode_kelas": kode,
+                    "nama_kelas": room(room_index),
+                    "nip": nip(room_index * len(DAYS) + slot_index // len(TIMES)),
+                    "kode_mk": kode_mk(rng.randrange(n["mata_kuliah"])),
+                    "hari": hari,
+                    "jam": jam,
+                    "durasi": 100,
+                    "kapasitas": None,
+                    "jumlah_mahasiswa": enrolled[kode - 1],
+                }
+            )
+
+    return {
+        "mata_kuliah": courses,
+        "dosen": lecturers,
+        "mahasiswa": students,
+        "kelas": classes,
+        "kelas_ampu": enrollments,
+    }
+
+
+def insert_rows(session, model, rows):
+    for start in range(0, len(rows), CHUNK_SIZE):
+        session.execute(insert(model), rows[start : start + CHUNK_SIZE])
+
+
+# replace the content of the database with the dataset of a scale factor
+def load(app_module, scale, seed=0, create=False):
+    db = app_module.db
+    data = generate(scale, seed)
+    with app_module.create_app().app_context():
+        if create:
+            # the migrations create what create_all() cannot: the pg_trgm extension
+            # of the trigram indexes and the triggers of the registry read model
+            if db.engine.dialect.name == "postgresql":
+                raise SystemExit("--create is not for Postgres, run flask db upgrade")
+            db.create_all()
+        session = db.session
+        for model in (
+            app_module.Kelas_Ampu,
+            app_module.Kelas,
+            app_module.Mahasiswa,
+            app_module.Dosen,
+            app_module.Mata_Kuliah,
+        ):
+            session.execute(delete(model))
+        insert_rows(session, app_module.Mata_Kuliah, data["mata_kuliah"])
+        insert_rows(session, app_module.Dosen, data["dosen"])
+        insert_rows(session, app_module.Mahasiswa, data["mahasiswa"])
+        insert_rows(session, app_module.Kelas, data["kelas"])
+        insert_rows(session, app_module.Kelas_Ampu, data["kelas_ampu"])
+
+        if db.engine.dialect.name == "postgresql":
+            # keep the serial of kelas ahead of the explicit ids
+            session.execute(
+                text(
+                    "SELECT setval(pg_get_serial_sequence('kelas', 'kode_kelas'), "
+                    "(SELECT max(kode_kelas) FROM kelas))"
+                )
+            )
+        else:
+            # without the Postgres triggers the registry read model is filled here
+            fill_registry_detail(app_module, data)
+        session.commit()
+    return {table: len(rows) for table, rows in data.items()}
+
+
+def fill_registry_detail(app_module, data):
+    session = app_module.db.session
+    session.execute(delete(app_module.Kelas_Ampu_Detail))
+    courses = {row["kode_mk"]: row for row in data["mata_kuliah"]}
+    lecturers = {row["nip"]: row for row in data["dosen"]}
+    students = {row["nim"]: row for row in data["mahasiswa"]}
+    classes = {row["kode_kelas"]: row for row in data["kelas"]}
+    rows = []
+    for ampu in data["kelas_ampu"]:
+        kelas = classes[ampu["kode_kelas"]]
+        rows.append(
+            {
+                "kode_kelas": ampu["kode_kelas"],
+                "nim": ampu["nim"],
+                "nama_mhs": students[ampu["nim"]]["nama_mhs"],
+                "nama_kelas": kelas["nama_kelas"],
+                "hari": kelas["hari"],
+                "jam": kelas["jam"],
+                "nip": kelas["nip"],
+                "nama_dosen": lecturers[kelas["nip"]]["nama_dosen"],
+                "kode_mk": kelas["kode_mk"],
+                "nama_mk": courses[kelas["kode_mk"]]["nama_mk"],
+            }
+        )
+    insert_rows(session, app_module.Kelas_Ampu_Detail, rows)
@@ -0,0 +1,105 @@
+import json
+import os
+import select
+import signal
+import time
+
+from sqlalchemy import text
+
+# FORKED WORKERS
+# checks that worker processes forked from a process that already used the app (as
+# serve.py and gunicorn fork them) never share a database connection: the parent
+# opens a pooled connection, forks the workers, every worker queries on its own
+# connection and holds it until all of them answered, then the parent queries
+# again. Every connection must belong to another Postgres backend (pg_backend_pid)
+# and the parent must still be on its own. Postgres only. Two processes on one
+# connection usually hang instead of failing, a worker that has not answered after
+# timeout seconds is killed and the check fails.
+
+
+def backend_pid(db):
+    pid = db.session.execute(text("SELECT pg_backend_pid()")).scalar()
+    # the connection goes back to the pool and stays open, as in a worker
+    db.session.commit()
+    return pid
+
+
+def worker(app_module, app, output, release):
+    with app.app_context():
+        pid = backend_pid(app_module.db)
+    os.write(output, json.dumps([pid, app_module.process_id]).encode())
+    os.close(output)
+    # keep the connection until every worker answered, a backend of a worker that
+    # is gone could otherwise be reused by the next one
+    os.read(release, 1)
+
+
+# what a worker wrote to its pipe before it closed it or the deadline passed
+def read_answer(output, deadline):
+    data = b""
+    while select.select([output], [], [], max(deadline - time.monotonic(), 0))[0]:
+        chunk = os.read(output, 1024)
+        if not chunk:
+            return json.loads(data) if data else None
+        data += chunk
+    return None
+
+
+def run(app_module, workers=4, timeout=30):
+    app = app_module.create_app()
+    with app.app_context():
+        if app_module.db.engine.dialect.name != "postgresql":
+            raise SystemExit("the fork check needs a Postgres database")
+        parent = backend_pid(app_module.db)
+    parent_process_id = app_module.process_id
+
+    release, hold = os.pipe()
+    children = []
+    for _ in range(workers):
+        output, child_output = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                os.close(hold)
+                os.close(output)
+                worker(app_module, app, child_output, release)
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(child_output)
+        children.append((pid, output))
+
+    deadline = time.monotonic() + timeout
+    answers = []
+    for pid, output in children:
+        answers.append(read_answer(output, deadline))
+        os.close(output)
+    os.close(hold)
+    for (pid, _), answer in zip(children, answers):
+        if answer is None:
+            os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+    if None in answers:
+        # the connection of the parent may be shared with a worker that hung on it
+        return {"worker_backends": answers, "timed_out": True, "ok": False}
+
+    with app.app_context():
+        parent_after = backend_pid(app_module.db)
+
+    backends = [answer[0] for answer in answers if answer]
+    process_ids = [answer[1] for answer in answers if answer]
+    ok = (
+        len(backends) == workers
+        and len({parent, *backends}) == workers + 1
+        and parent_after == parent
+        and len({parent_process_id, *process_ids}) == workers + 1
+    )
+    return {
+        "parent_backend": parent,
+        "parent_backend_after": parent_after,
+        "worker_backends": backends,
+        "worker_process_ids": process_ids,
+        "ok": ok,
+    }
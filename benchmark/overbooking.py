@@ -0,0 +1,96 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import delete, func, update
+
+from benchmark import datagen, runner
+
+# OVERBOOKING
+# checks that concurrent enrollments never overbook a class: threads enroll twice
+# as many students as there are seats into one class of the free slot of the
+# generated dataset (see datagen.py) at once, then the class must hold exactly
+# kapasitas students and jumlah_mahasiswa must match its enrollments. The class is
+# emptied and its capacity restored afterwards. Postgres only, like /registry.
+
+
+def class_state(app_module, kode_kelas):
+    db, Kelas, Kelas_Ampu = app_module.db, app_module.Kelas, app_module.Kelas_Ampu
+    enrolled = db.session.query(func.count()).filter(
+        Kelas_Ampu.kode_kelas == kode_kelas
+    )
+    jumlah = db.session.query(Kelas.jumlah_mahasiswa).filter(
+        Kelas.kode_kelas == kode_kelas
+    )
+    return enrolled.scalar(), jumlah.scalar()
+
+
+def empty_class(app_module, kode_kelas, kapasitas):
+    db, Kelas, Kelas_Ampu = app_module.db, app_module.Kelas, app_module.Kelas_Ampu
+    db.session.execute(delete(Kelas_Ampu).where(Kelas_Ampu.kode_kelas == kode_kelas))
+    db.session.execute(
+        update(Kelas)
+        .where(Kelas.kode_kelas == kode_kelas)
+        .values(kapasitas=kapasitas, jumlah_mahasiswa=0)
+    )
+    db.session.commit()
+
+
+def run(app_module, kapasitas=50, threads=32, base_url=None):
+    app = app_module.create_app()
+    kode_kelas = datagen.kode_kelas(0, datagen.FREE_SLOT)
+    with app.app_context():
+        db = app_module.db
+        if db.engine.dialect.name != "postgresql":
+            raise SystemExit("the overbooking check needs a Postgres database")
+        Kelas, Mahasiswa = app_module.Kelas, app_module.Mahasiswa
+        original = db.session.get(Kelas, kode_kelas)
+        if original is None:
+            raise SystemExit("no class in the free slot, run generate first")
+        original_kapasitas = original.kapasitas
+        students = [
+            nim
+            for nim, in db.session.query(Mahasiswa.nim)
+            .order_by(Mahasiswa.nim)
+            .limit(kapasitas * 2)
+        ]
+        empty_class(app_module, kode_kelas, kapasitas)
+
+    if base_url:
+        transport = runner.HTTPTransport(base_url)
+    else:
+        transport = runner.TestClientTransport(app)
+
+    def enroll(nim):
+        body = {"kode_kelas": kode_kelas, "nim": nim}
+        return transport.send("POST", "/registry", body, {})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        statuses = list(executor.map(enroll, students))
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        enrolled, jumlah = class_state(app_module, kode_kelas)
+        empty_class(app_module, kode_kelas, original_kapasitas)
+
+    accepted = statuses.count(200)
+    counts = {}
+    for status in statuses:
+        counts[status] = counts.get(status, 0) + 1
+    return {
+        "meta": {
+            "kode_kelas": kode_kelas,
+            "kapasitas": kapasitas,
+            "attempts": len(students),
+            "threads": threads,
+            "mode": transport.mode,
+        },
+        "statuses": counts,
+        "enrolled": enrolled,
+        "jumlah_mahasiswa": jumlah,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(len(students) / elapsed, 2),
+        "enrollments_per_s": round(accepted / elapsed, 2),
+        "ok": enrolled == jumlah == accepted <= kapasitas
+        and accepted == min(kapasitas, len(students)),
+    }
@@ -0,0 +1,265 @@
+import base64
+import datetime
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark import datagen
+
+# SCENARIO RUNNER
+# every scenario is a function building the requests of one iteration from a worker
+# and a random generator, a request is (method, path, json body, headers)
+
+
+def basic_auth(username, password=""):
+    token = base64.b64encode(f"{username}:{password}".encode()).decode()
+    return {"Authorization": f"Basic {token}"}
+
+
+def courses(worker, rng, n):
+    return [("GET", "/courses", None, {})]
+
+
+def schedules(worker, rng, n):
+    return [("GET", "/schedules?limit=100", None, {})]
+
+
+def regs(worker, rng, n):
+    return [("GET", "/regs?limit=100", None, {})]
+
+
+def search(worker, rng, n):
+    nim = datagen.nim(rng.randrange(n["mahasiswa"]))
+    return [("GET", f"/searchregistry?nim={nim}", None, {})]
+
+
+def students(worker, rng, n):
+    return [("GET", "/students?limit=100", None, basic_auth(datagen.nim(0)))]
+
+
+# the details of one class worth of students, a hundred keys in one request
+def lookup(worker, rng, n):
+    start = rng.randrange(max(n["mahasiswa"] - 100, 1))
+    nims = ",".join(datagen.nim(i) for i in range(start, start + 100))
+    return [("GET", f"/students?nim={nims}", None, basic_auth(datagen.nim(0)))]
+
+
+# enroll a student in the free slot of the week and cancel it again, so that the
+# dataset is unchanged after the run. Workers use disjoint students, otherwise two
+# of them could enroll the same student twice.
+def registry(worker, rng, n):
+    students = range(worker.index, n["mahasiswa"], worker.concurrency)
+    nim = datagen.nim(rng.choice(students))
+    kode = datagen.kode_kelas(rng.randrange(n["rooms"]), datagen.FREE_SLOT)
+    return [
+        ("POST", "/registry", {"kode_kelas": kode, "nim": nim}, {}),
+        ("DELETE", f"/registry?kode_kelas={kode}&nim={nim}", None, {}),
+    ]
+
+
+SCENARIOS = {
+    "courses": courses,
+    "schedules": schedules,
+    "regs": regs,
+    "search": search,
+    "students": students,
+    "lookup": lookup,
+    "registry": registry,
+}
+
+# the registry writes use Postgres only statements
+POSTGRES_ONLY = {"registry"}
+
+
+# sends requests through the Flask test client, one client per worker thread
+class TestClientTransport:
+    mode = "test-client"
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def send(self, method, path, body, headers):
+        if not hasattr(self.local, "client"):
+            self.local.client = self.app.test_client()
+        response = self.local.client.open(
+            path, method=method, json=body, headers=headers
+        )
+        response.close()
+        return response.status_code
+
+
+# sends requests to a running server, e.g. http://127.0.0.1:5000
+class HTTPTransport:
+    mode = "http"
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def send(self, method, path, body, headers):
+        data = None
+        headers = dict(headers)
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        request = urllib.request.Request(
+            self.base_url + path, data=data, headers=headers, method=method
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            error.read()
+            return error.code
+
+
+class Worker:
+    def __init__(self, index, concurrency, seed):
+        self.index = index
+        self.concurrency = concurrency
+        self.rng = random.Random(seed * 1000 + index)
+
+
+# run the iterations of a scenario spread over the workers, returns the latency of
+# every request in seconds and the count of each status code
+def run_scenario(transport, scenario, n, requests, concurrency, seed):
+    latencies = {}
+    statuses = {}
+    lock = threading.Lock()
+
+    def work(worker, iterations):
+        for _ in range(iterations):
+            for method, path, body, headers in scenario(worker, worker.rng, n):
+                endpoint = f"{method} {path.split('?')[0]}"
+                start = time.perf_counter()
+                status = transport.send(method, path, body, headers)
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.setdefault(endpoint, []).append(elapsed)
+                    counts = statuses.setdefault(endpoint, {})
+                    counts[status] = counts.get(status, 0) + 1
+
+    workers = [Worker(index, concurrency, seed) for index in range(concurrency)]
+    shares = [
+        requests // concurrency + (index < requests % concurrency)
+        for index in range(concurrency)
+    ]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        for future in [
+            executor.submit(work, worker, share)
+            for worker, share in zip(workers, shares)
+        ]:
+            future.result()
+    return latencies, statuses, time.perf_counter() - start
+
+
+# nearest rank percentile of sorted values
+def percentile(values, rank):
+    index = max(0, -(-len(values) * rank // 100) - 1)
+    return values[int(index)]
+
+
+def summarize(latencies, statuses, elapsed):
+    endpoints = {}
+    for endpoint, values in sorted(latencies.items()):
+        values = sorted(values)
+        counts = statuses[endpoint]
+        endpoints[endpoint] = {
+            "requests": len(values),
+            "errors": sum(count for status, count in counts.items() if status >= 400),
+            "statuses": {
+                str(status): count for status, count in sorted(counts.items())
+            },
+            "throughput_rps": round(len(values) / elapsed, 2) if elapsed else None,
+            "latency_ms": {
+                "p50": round(percentile(values, 50) * 1000, 3),
+                "p95": round(percentile(values, 95) * 1000, 3),
+                "p99": round(percentile(values, 99) * 1000, 3),
+                "mean": round(sum(values) / len(values) * 1000, 3),
+                "max": round(values[-1] * 1000, 3),
+            },
+        }
+    return endpoints
+
+
+# run the scenarios one after the other and build the report
+# - scale must match the scale factor the database was generated with
+# - app_module is used through the test client unless base_url is given
+def run(
+    scale,
+    scenarios=None,
+    requests=200,
+    concurrency=4,
+    seed=0,
+    app_module=None,
+    base_url=None,
+    postgres=True,
+):
+    if base_url:
+        transport = HTTPTransport(base_url)
+    else:
+        flask_app = app_module.create_app()
+        transport = TestClientTransport(flask_app)
+        with flask_app.app_context():
+            postgres = app_module.db.engine.dialect.name == "postgresql"
+
+    n = datagen.sizes(scale)
+    report = {
+        "meta": {
+            "scale": scale,
+            "requests": requests,
+            "concurrency": concurrency,
+            "seed": seed,
+            "mode": transport.mode,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        },
+        "scenarios": {},
+        "skipped": [],
+    }
+    for name in scenarios or SCENARIOS:
+        if name in POSTGRES_ONLY and not postgres:
+            report["skipped"].append(name)
+            continue
+        latencies, statuses, elapsed = run_scenario(
+            transport, SCENARIOS[name], n, requests, concurrency, seed
+        )
+        report["scenarios"][name] = {
+            "elapsed_s": round(elapsed, 3),
+            "endpoints": summarize(latencies, statuses, elapsed),
+        }
+    return report
+
+
+# change of every endpoint between two reports, negative latency changes and
+# positive throughput changes are improvements
+def compare(before, after):
+    changes = {}
+    for name, scenario in after["scenarios"].items():
+        old_scenario = before["scenarios"].get(name)
+        if not old_scenario:
+            continue
+        for endpoint, new in scenario["endpoints"].items():
+            old = old_scenario["endpoints"].get(endpoint)
+            if not old:
+                continue
+            change = {
+                key: relative_change(old["latency_ms"][key], new["latency_ms"][key])
+                for key in ("p50", "p95", "p99")
+            }
+            change["throughput_rps"] = relative_change(
+                old["throughput_rps"], new["throughput_rps"]
+            )
+            changes[f"{name}: {endpoint}"] = change
+    return changes
+
+
+def relative_change(old, new):
+    if not old or new is None:
+        return None
+    return round((new - old) / old * 100, 1)
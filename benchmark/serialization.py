@@ -0,0 +1,124 @@
+import datetime
+import time
+from collections import namedtuple
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from benchmark import datagen
+
+# SERIALIZATION MICROBENCHMARK
+# encoding throughput of registry rows without a database: the serializer and the
+# JSON provider of the app against the previous attribute based serializer and the
+# default provider of Flask
+
+# rows of registry_query() support both attribute and tuple access, like these
+RegistryRow = namedtuple(
+    "RegistryRow",
+    [
+        "kode_kelas",
+        "nama_kelas",
+        "nama_mk",
+        "hari",
+        "jam",
+        "nama_dosen",
+        "nim",
+        "nama_mhs",
+    ],
+)
+
+
+def registry_rows(count):
+    rows = []
+    for index in range(count):
+        hari, jam = datagen.SLOTS[index % len(datagen.SLOTS)]
+        rows.append(
+            RegistryRow(
+                index % 200 + 1,
+                datagen.room(index % 8),
+                f"Mata Kuliah {index % 100}",
+                hari,
+                jam,
+                f"Dosen {index % 40}",
+                datagen.nim(index // 6),
+                f"Mahasiswa {index // 6}",
+            )
+        )
+    return rows
+
+
+# the serializer before it worked on row tuples
+def baseline_registry_to_dict(row):
+    return {
+        "jadwal": {
+            "ruang": row.nama_kelas,
+            "mata_kuliah": row.nama_mk,
+            "hari": row.hari,
+            "jam": row.jam.strftime("%H:%M"),
+            "dosen": row.nama_dosen,
+        },
+        "mahasiswa": {"nama": row.nama_mhs, "nim": row.nim},
+    }
+
+
+def measure(rows, to_dict, provider, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = [to_dict(row) for row in rows]
+        serialized = time.perf_counter()
+        body = provider.response(items).get_data()
+        encoded = time.perf_counter()
+        timing = (serialized - start, encoded - serialized, len(body))
+        if best is None or sum(timing[:2]) < sum(best[:2]):
+            best = timing
+    serialize, encode, size = best
+    return {
+        "serialize_s": round(serialize, 4),
+        "encode_s": round(encode, 4),
+        "total_s": round(serialize + encode, 4),
+        "rows_per_s": round(len(rows) / (serialize + encode)),
+        "bytes": size,
+    }
+
+
+def run(app_module, count=100000, repeat=3):
+    import jsonprovider
+
+    rows = registry_rows(count)
+    flask_app = Flask(__name__)
+    report = {
+        "meta": {
+            "rows": count,
+            "repeat": repeat,
+            "orjson": jsonprovider.orjson is not None,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        },
+        "before": measure(
+            rows, baseline_registry_to_dict, DefaultJSONProvider(flask_app), repeat
+        ),
+        "after": measure(
+            rows,
+            app_module.registry_to_dict,
+            jsonprovider.FastJSONProvider(flask_app),
+            repeat,
+        ),
+    }
+
+    # the same provider when orjson is not installed
+    orjson = jsonprovider.orjson
+    jsonprovider.orjson = None
+    try:
+        report["after_stdlib"] = measure(
+            rows,
+            app_module.registry_to_dict,
+            jsonprovider.FastJSONProvider(flask_app),
+            repeat,
+        )
+    finally:
+        jsonprovider.orjson = orjson
+
+    report["speedup"] = round(
+        report["before"]["total_s"] / report["after"]["total_s"], 2
+    )
+    return report
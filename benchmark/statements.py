@@ -0,0 +1,79 @@
+import time
+
+from sqlalchemy import event
+
+from benchmark import datagen
+
+# STATEMENTS PER REQUEST
+# checks that the read endpoints run a fixed number of SQL statements however much
+# data they return (no N+1 queries): the dataset is loaded at each scale factor and
+# every endpoint is requested while counting the statements the engine executes,
+# the counts must be equal at every scale. Each endpoint is requested once before
+# counting, so that the process caches are warm at every scale alike.
+
+# path of each endpoint for a sample enrollment (kode_kelas, nim) of the dataset
+ENDPOINTS = {
+    "GET /schedules": lambda sample: "/schedules?include=roster",
+    "GET /schedule/<code>": lambda sample: f"/schedule/{sample[0]}?include=roster",
+    "GET /regs": lambda sample: "/regs",
+    "GET /registry": lambda sample: f"/registry?kode_kelas={sample[0]}&nim={sample[1]}",
+}
+
+# seconds to wait for the reference cache (see refcache.py) to start listening
+REFERENCE_CACHE_TIMEOUT = 5
+
+
+def count_statements(app, engine, path):
+    client = app.test_client()
+    client.get(path).close()
+    count = 0
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        nonlocal count
+        count += 1
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        response = client.get(path)
+        response.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+    return response.status_code, count
+
+
+def run(app_module, scales=(0.1, 0.5), seed=0, create=False):
+    report = {
+        "meta": {"scales": list(scales), "seed": seed},
+        "endpoints": {name: {} for name in ENDPOINTS},
+    }
+    for scale in scales:
+        datagen.load(app_module, scale, seed, create)
+        app = app_module.create_app()
+        with app.app_context():
+            engine = app_module.db.engine
+            Kelas_Ampu = app_module.Kelas_Ampu
+            sample = (
+                app_module.db.session.query(Kelas_Ampu.kode_kelas, Kelas_Ampu.nim)
+                .order_by(Kelas_Ampu.kode_kelas, Kelas_Ampu.nim)
+                .first()
+            )
+            # measure every scale with the reference cache listening
+            if app.config["REFERENCE_CACHE"] and engine.dialect.name == "postgresql":
+                deadline = time.monotonic() + REFERENCE_CACHE_TIMEOUT
+                while not app_module.reference_cache.ready():
+                    if time.monotonic() > deadline:
+                        break
+                    time.sleep(0.05)
+        for name, path in ENDPOINTS.items():
+            status, count = count_statements(app, engine, path(sample))
+            report["endpoints"][name][str(scale)] = {
+                "status": status,
+                "statements": count,
+            }
+
+    report["ok"] = all(
+        len({result["statements"] for result in results.values()}) == 1
+        and all(result["status"] == 200 for result in results.values())
+        for results in report["endpoints"].values()
+    )
+    return report
@@ -0,0 +1,263 @@
+import bisect
+import threading
+import time
+from collections import ChainMap, defaultdict, namedtuple
+
+# IN-MEMORY TIMETABLE CONFLICT ENGINE
+# every class takes a time range on one day, the engine keeps those ranges per room,
+# per lecturer and per student so that schedule and registry writes can be checked
+# for overlaps without querying the database
+
+# time range of a class, start and end are minutes since midnight
+Slot = namedtuple("Slot", ["ruang", "nip", "hari", "start", "end"])
+
+
+def make_slot(ruang, nip, hari, jam, durasi):
+    start = jam.hour * 60 + jam.minute
+    return Slot(ruang, nip, hari.lower(), start, start + durasi)
+
+
+# time ranges grouped by owner (a room, a lecturer or a student) and day, each group
+# is kept sorted by start time. An index over a base index reads the groups of the
+# base and copies a group only when it changes it, a scratch copy of a large index
+# then costs only the groups it touches.
+class IntervalIndex:
+    def __init__(self, base=None):
+        self._groups = {}
+        self._base = base
+
+    def _group(self, key):
+        group = self._groups.get(key)
+        if group is None and self._base is not None:
+            return self._base._group(key)
+        return group or ()
+
+    def _own_group(self, key):
+        group = self._groups.get(key)
+        if group is None:
+            base = self._base._group(key) if self._base is not None else ()
+            group = self._groups[key] = list(base)
+        return group
+
+    def add(self, owner, slot, key):
+        bisect.insort(self._own_group((owner, slot.hari)), (slot.start, slot.end, key))
+
+    def remove(self, owner, slot, key):
+        if not self._group((owner, slot.hari)):
+            return
+        group = self._own_group((owner, slot.hari))
+        entry = (slot.start, slot.end, key)
+        index = bisect.bisect_left(group, entry)
+        if index < len(group) and group[index] == entry:
+            del group[index]
+        # an empty group hides the group of the base
+        if not group and self._base is None:
+            del self._groups[(owner, slot.hari)]
+
+    # keys of the ranges of an owner that overlap the slot, ranges that only touch
+    # the slot (one ends when the other starts) do not overlap
+    def overlapping(self, owner, slot, ignore=()):
+        group = self._group((owner, slot.hari))
+        # only ranges that start before the end of the slot can overlap it
+        stop = bisect.bisect_left(group, (slot.end,))
+        return [
+            key
+            for start, end, key in group[:stop]
+            if end > slot.start and key not in ignore
+        ]
+
+
+class ConflictEngine:
+    def __init__(self, ttl=60):
+        # the engine is process local, reloading it after ttl seconds bounds how long
+        # writes of other processes can go unnoticed
+        self.ttl = ttl
+        self.loaded_at = None
+        # bumped by expire(), a load that started before keeps the engine expired
+        self.generation = 0
+        self.lock = threading.RLock()
+        # held by the thread that reloads the engine
+        self.reload_lock = threading.RLock()
+        # the writes made while a load reads the database, replayed onto its result
+        self._journal = None
+        self._reset()
+
+    def _reset(self):
+        self.classes = {}
+        self.enrollments = defaultdict(set)
+        self.rooms = IntervalIndex()
+        self.lecturers = IntervalIndex()
+        self.students = IntervalIndex()
+
+    # replace the contents of the engine, the new index is built without the lock so
+    # that checks keep using the current one meanwhile
+    # - classes is an iterable of (kode_kelas, slot)
+    # - enrollments is an iterable of (kode_kelas, nim)
+    def load(self, classes, enrollments):
+        with self.reload_lock:
+            with self.lock:
+                generation = self.generation
+                self._journal = []
+            try:
+                fresh = ConflictEngine(self.ttl)
+                for kode_kelas, slot in classes:
+                    fresh.set_class(kode_kelas, slot)
+                for kode_kelas, nim in enrollments:
+                    fresh.enroll(kode_kelas, nim)
+                with self.lock:
+                    for write, args in self._journal:
+                        getattr(fresh, write)(*args)
+                    self.classes = fresh.classes
+                    self.enrollments = fresh.enrollments
+                    self.rooms = fresh.rooms
+                    self.lecturers = fresh.lecturers
+                    self.students = fresh.students
+                    if generation == self.generation:
+                        self.loaded_at = time.monotonic()
+            finally:
+                with self.lock:
+                    self._journal = None
+
+    # reload the engine with the (classes, enrollments) that fetch() returns when it
+    # is stale, by one thread at a time: the others wait for an engine that has never
+    # been loaded or was expired, and go on with one that is merely old
+    def refresh(self, fetch):
+        if not self.reload_lock.acquire(blocking=self.loaded_at is None):
+            return
+        try:
+            if self.is_stale():
+                self.load(*fetch())
+        finally:
+            self.reload_lock.release()
+
+    def is_stale(self):
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl
+
+    def expire(self):
+        with self.lock:
+            self.generation += 1
+            self.loaded_at = None
+
+    def _record(self, write, *args):
+        if self._journal is not None:
+            self._journal.append((write, args))
+
+    # WRITES
+    def set_class(self, kode_kelas, slot):
+        with self.lock:
+            self._record("set_class", kode_kelas, slot)
+            old = self.classes.get(kode_kelas)
+            if old:
+                self.rooms.remove(old.ruang, old, kode_kelas)
+                self.lecturers.remove(old.nip, old, kode_kelas)
+            self.classes[kode_kelas] = slot
+            self.rooms.add(slot.ruang, slot, kode_kelas)
+            self.lecturers.add(slot.nip, slot, kode_kelas)
+
+            # the students of a moved class move along with it
+            for nim in self.enrollments.get(kode_kelas, ()):
+                if old:
+                    self.students.remove(nim, old, kode_kelas)
+                self.students.add(nim, slot, kode_kelas)
+
+    def remove_class(self, kode_kelas):
+        with self.lock:
+            self._record("remove_class", kode_kelas)
+            slot = self.classes.pop(kode_kelas, None)
+            if not slot:
+                return
+            self.rooms.remove(slot.ruang, slot, kode_kelas)
+            self.lecturers.remove(slot.nip, slot, kode_kelas)
+            for nim in self.enrollments.pop(kode_kelas, ()):
+                self.students.remove(nim, slot, kode_kelas)
+
+    def enroll(self, kode_kelas, nim):
+        with self.lock:
+            self._record("enroll", kode_kelas, nim)
+            slot = self.classes.get(kode_kelas)
+            if not slot or nim in self.enrollments[kode_kelas]:
+                return
+            self.enrollments[kode_kelas].add(nim)
+            self.students.add(nim, slot, kode_kelas)
+
+    def unenroll(self, kode_kelas, nim):
+        with self.lock:
+            self._record("unenroll", kode_kelas, nim)
+            slot = self.classes.get(kode_kelas)
+            if not slot or nim not in self.enrollments.get(kode_kelas, ()):
+                return
+            self.enrollments[kode_kelas].discard(nim)
+            self.students.remove(nim, slot, kode_kelas)
+
+    # CHECKS
+    # conflicts of placing a class (a new one when kode_kelas is None) in a slot
+    def schedule_conflicts(self, slot, kode_kelas=None):
+        ignore = {kode_kelas}
+        with self.lock:
+            conflicts = [
+                {"type": "ruang", "kode_kelas": key}
+                for key in self.rooms.overlapping(slot.ruang, slot, ignore)
+            ]
+            conflicts += [
+                {"type": "dosen", "kode_kelas": key}
+                for key in self.lecturers.overlapping(slot.nip, slot, ignore)
+            ]
+            # moving a class must keep its students free as well
+            for nim in sorted(self.enrollments.get(kode_kelas, ())):
+                conflicts += [
+                    {"type": "mahasiswa", "kode_kelas": key, "nim": nim}
+                    for key in self.students.overlapping(nim, slot, ignore)
+                ]
+        return conflicts
+
+    # conflicts of enrolling a student in a class, pending is a list of classes the
+    # student is being enrolled in by the same request
+    def enrollment_conflicts(self, kode_kelas, nim, pending=()):
+        with self.lock:
+            slot = self.classes.get(kode_kelas)
+            if not slot:
+                return []
+            keys = self.students.overlapping(nim, slot, {kode_kelas})
+            for other in pending:
+                other_slot = self.classes.get(other)
+                if (
+                    other != kode_kelas
+                    and other_slot
+                    and other_slot.hari == slot.hari
+                    and other_slot.start < slot.end
+                    and slot.start < other_slot.end
+                    and other not in keys
+                ):
+                    keys.append(other)
+        return [{"type": "mahasiswa", "kode_kelas": key, "nim": nim} for key in keys]
+
+    # validate a whole timetable at once, as if every item was applied in order
+    # - items is a list of (kode_kelas or None for a new class, slot)
+    # - returns the conflicts of each item, new classes are referred to by their
+    #   position in the list
+    def timetable_conflicts(self, items):
+        results = []
+        with self.lock:
+            scratch = self.scratch()
+            for index, (kode_kelas, slot) in enumerate(items):
+                # new classes get negative keys so they never clash with a kode_kelas
+                key = kode_kelas if kode_kelas is not None else -(index + 1)
+                conflicts = scratch.schedule_conflicts(slot, key)
+                for conflict in conflicts:
+                    if conflict["kode_kelas"] < 0:
+                        conflict["item"] = -conflict.pop("kode_kelas") - 1
+                results.append(conflicts)
+                scratch.set_class(key, slot)
+        return results
+
+    # an engine to try out schedule writes on, reading through to this one: the
+    # classes and the indexes copy only what the writes change and the enrollments,
+    # which set_class() only reads, are shared. Only usable while holding the lock.
+    def scratch(self):
+        clone = ConflictEngine(self.ttl)
+        clone.classes = ChainMap({}, self.classes)
+        clone.enrollments = self.enrollments
+        clone.rooms = IntervalIndex(self.rooms)
+        clone.lecturers = IntervalIndex(self.lecturers)
+        clone.students = IntervalIndex(self.students)
+        return clone
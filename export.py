@@ -0,0 +1,170 @@
+import csv
+import datetime
+import io
+import queue
+import threading
+
+from handoff import Cancelled, Handoff
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# BULK EXPORT
+# whole tables streamed to the client with bounded memory: CSV straight from
+# Postgres COPY ... TO STDOUT, and Parquet (when pyarrow is installed) written one
+# row group per batch of a server-side cursor
+
+# COPY hands over one row at a time, rows are sent on in chunks of about this size
+# and at most QUEUE_SIZE chunks wait for a slow client
+CHUNK_SIZE = 1 << 16
+QUEUE_SIZE = 16
+
+
+# file object COPY writes to, passing full chunks to the handoff of the response
+class ChunkWriter:
+    def __init__(self, handoff):
+        self.put = handoff.put
+        self.buffer = []
+        self.size = 0
+
+    def write(self, data):
+        self.buffer.append(data)
+        self.size += len(data)
+        if self.size >= CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.put(b"".join(self.buffer))
+            self.buffer = []
+            self.size = 0
+
+
+# stream the CSV output of a COPY statement, psycopg2 only offers a blocking copy
+# into a file so the copy runs in a thread with its own pooled connection
+def copy_csv(engine, sql):
+    statement = f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER)"
+    chunks = queue.SimpleQueue()
+    handoff = Handoff(QUEUE_SIZE, chunks.put)
+    done = object()
+    connection = engine.raw_connection()
+    writer = ChunkWriter(handoff)
+
+    def produce():
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.copy_expert(statement, writer)
+            finally:
+                cursor.close()
+            writer.flush()
+            writer.put(done)
+        except Cancelled:
+            pass
+        except Exception as error:
+            try:
+                writer.put(error)
+            except Cancelled:
+                pass
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    finished = False
+    try:
+        while True:
+            item = chunks.get()
+            handoff.taken()
+            if item is done:
+                finished = True
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        handoff.cancel()
+        thread.join()
+        if finished:
+            connection.rollback()
+            connection.close()
+        else:
+            # the connection may be in the middle of a COPY, do not reuse it
+            connection.invalidate()
+            connection.close()
+
+
+# stream rows as CSV with the csv module, for databases without COPY
+# - batches is an iterable of lists of row tuples
+def rows_csv(batches, names):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(names)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+# file object the Parquet writer writes to, emptied after every row group
+class BytesSink:
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def arrow_type(column_type):
+    python_type = column_type.python_type
+    if python_type is int:
+        return pyarrow.int64()
+    if python_type is float:
+        return pyarrow.float64()
+    if python_type is bool:
+        return pyarrow.bool_()
+    if python_type is datetime.time:
+        return pyarrow.time64("us")
+    return pyarrow.string()
+
+
+# stream rows as Parquet, one row group per batch
+# - columns is a list of (name, SQLAlchemy type) in the order of the row tuples
+def parquet(batches, columns):
+    schema = pyarrow.schema([(name, arrow_type(type)) for name, type in columns])
+    sink = BytesSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    try:
+        for rows in batches:
+            arrays = [
+                pyarrow.array(values, type=field.type)
+                for values, field in zip(zip(*rows), schema)
+            ]
+            writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,41 @@
+import threading
+
+# BOUNDED HANDOFF
+# passes the chunks of a response from the thread producing them (a COPY, a Flask
+# app run from asgi.py) to the consumer sending them to the client, with at most
+# size chunks waiting for a slow client. The producer waits for room, and gives up
+# with Cancelled once the consumer has gone away, so that the thread never blocks
+# on a client that will not read any more.
+
+# seconds between two checks of a waiting producer for the cancellation
+POLL_INTERVAL = 0.1
+
+
+class Cancelled(Exception):
+    pass
+
+
+class Handoff:
+    # deliver(item) hands an item to the consumer without blocking, e.g. the
+    # put_nowait of an unbounded queue, the room is counted here
+    def __init__(self, size, deliver):
+        self.deliver = deliver
+        self.cancelled = threading.Event()
+        self._room = threading.Semaphore(size)
+
+    # called by the producer, waits for room in the queue, giving up once the
+    # client has gone away
+    def put(self, item):
+        while not self.cancelled.is_set():
+            if self._room.acquire(timeout=POLL_INTERVAL):
+                self.deliver(item)
+                return
+        raise Cancelled
+
+    # called by the consumer for every item it took
+    def taken(self):
+        self._room.release()
+
+    # called by the consumer when it stops taking items
+    def cancel(self):
+        self.cancelled.set()
@@ -0,0 +1,49 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# FAST JSON PROVIDER
+# encodes responses with orjson when it is installed and with the stdlib encoder
+# of Flask otherwise. Keys stay sorted like with the default provider of Flask and
+# the types orjson does not know (e.g. Decimal) go through the same default hook.
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        if orjson is not None:
+            return self._orjson_dumps(obj, kwargs.get("indent")).decode()
+        if kwargs.get("indent") is None:
+            kwargs.setdefault("separators", (",", ":"))
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    # the body is handed over as bytes, skipping the decode and encode of a str
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = None
+        if self.compact is False or (self.compact is None and self._app.debug):
+            indent = 2
+        return self._app.response_class(
+            self._orjson_dumps(obj, indent), mimetype=self.mimetype
+        )
+
+    def _orjson_dumps(self, obj, indent=None):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+
+
+def init_app(app):
+    app.json = FastJSONProvider(app)
@@ -0,0 +1,39 @@
+"""kelas capacity
+
+Revision ID: 4a5328dc4573
+Revises: 6ec25a6824cb
+Create Date: 2026-10-18 10:03:27.551902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a5328dc4573'
+down_revision = '6ec25a6824cb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('kelas', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('kapasitas', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('jumlah_mahasiswa', sa.Integer(), server_default='0', nullable=False))
+
+    # start the enrolled counters from the current registry
+    op.execute(
+        """UPDATE kelas SET jumlah_mahasiswa = counts.n
+        FROM (SELECT kode_kelas, count(*) AS n FROM kelas_ampu GROUP BY kode_kelas) AS counts
+        WHERE kelas.kode_kelas = counts.kode_kelas"""
+    )
+
+    with op.batch_alter_table('kelas', schema=None) as batch_op:
+        batch_op.create_check_constraint('ck_kelas_kapasitas', 'jumlah_mahasiswa >= 0 AND (kapasitas IS NULL OR jumlah_mahasiswa <= kapasitas)')
+
+
+def downgrade():
+    with op.batch_alter_table('kelas', schema=None) as batch_op:
+        batch_op.drop_constraint('ck_kelas_kapasitas', type_='check')
+        batch_op.drop_column('jumlah_mahasiswa')
+        batch_op.drop_column('kapasitas')
@@ -0,0 +1,54 @@
+"""full text search
+
+Revision ID: 6e6bdf069fdc
+Revises: ff693da6c848
+Create Date: 2026-10-18 16:02:37.514208
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '6e6bdf069fdc'
+down_revision = 'ff693da6c848'
+branch_labels = None
+depends_on = None
+
+
+# a column as written and split into its letters and digits, so that a search finds
+# the parts of an email or a code too (the parser reads "IF-101" as "if" and "-101")
+def words(column):
+    return f"{column} || ' ' || regexp_replace({column}, '[^[:alnum:]]+', ' ', 'g')"
+
+
+# search document of each table: the name weighs more than the id and the email
+search_documents = {
+    'mahasiswa': (
+        "setweight(to_tsvector('simple', nama_mhs), 'A') || "
+        f"setweight(to_tsvector('simple', {words('nim')}), 'B') || "
+        f"setweight(to_tsvector('simple', {words('email_mhs')}), 'C')"
+    ),
+    'dosen': (
+        "setweight(to_tsvector('simple', nama_dosen), 'A') || "
+        f"setweight(to_tsvector('simple', {words('nip')}), 'B') || "
+        f"setweight(to_tsvector('simple', {words('email_dosen')}), 'C')"
+    ),
+    'mata_kuliah': (
+        "setweight(to_tsvector('simple', nama_mk), 'A') || "
+        f"setweight(to_tsvector('simple', {words('kode_mk')}), 'B')"
+    ),
+}
+
+
+def upgrade():
+    for table, document in search_documents.items():
+        op.add_column(table, sa.Column('search', postgresql.TSVECTOR(), sa.Computed(document, persisted=True), nullable=True))
+        op.create_index(f'ix_{table}_search', table, ['search'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    for table in reversed(list(search_documents)):
+        op.drop_index(f'ix_{table}_search', table_name=table)
+        op.drop_column(table, 'search')
@@ -0,0 +1,33 @@
+"""trigram search indexes
+
+Revision ID: 6ec25a6824cb
+Revises: 31534806a3cf
+Create Date: 2026-10-18 09:12:40.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6ec25a6824cb'
+down_revision = '31534806a3cf'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # GIN trigram indexes let ILIKE '%...%' in /searchregistry use an index scan
+    op.create_index('ix_mahasiswa_nim_trgm', 'mahasiswa', ['nim'], unique=False, postgresql_using='gin', postgresql_ops={'nim': 'gin_trgm_ops'})
+    op.create_index('ix_dosen_nama_dosen_trgm', 'dosen', ['nama_dosen'], unique=False, postgresql_using='gin', postgresql_ops={'nama_dosen': 'gin_trgm_ops'})
+    op.create_index('ix_mata_kuliah_nama_mk_trgm', 'mata_kuliah', ['nama_mk'], unique=False, postgresql_using='gin', postgresql_ops={'nama_mk': 'gin_trgm_ops'})
+    op.create_index('ix_kelas_hari_trgm', 'kelas', ['hari'], unique=False, postgresql_using='gin', postgresql_ops={'hari': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_kelas_hari_trgm', table_name='kelas')
+    op.drop_index('ix_mata_kuliah_nama_mk_trgm', table_name='mata_kuliah')
+    op.drop_index('ix_dosen_nama_dosen_trgm', table_name='dosen')
+    op.drop_index('ix_mahasiswa_nim_trgm', table_name='mahasiswa')
@@ -0,0 +1,70 @@
+"""reference_data notifications
+
+Revision ID: b27484d535ae
+Revises: 6e6bdf069fdc
+Create Date: 2026-10-18 18:24:51.630917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b27484d535ae'
+down_revision = '6e6bdf069fdc'
+branch_labels = None
+depends_on = None
+
+
+# every write to mata_kuliah and dosen notifies the reference_data channel with the
+# table, the operation, the key of the old row and the new row (without its search
+# document), the reference cache of each worker applies them (see refcache.py).
+# The notifications are delivered on commit, rolled back writes never arrive.
+FUNCTIONS = """
+CREATE FUNCTION notify_reference_data() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        PERFORM pg_notify('reference_data', json_build_object(
+            'table', TG_TABLE_NAME, 'op', TG_OP, 'old', NULL, 'new', NULL)::text);
+        RETURN NULL;
+    END IF;
+    PERFORM pg_notify('reference_data', json_build_object(
+        'table', TG_TABLE_NAME,
+        'op', TG_OP,
+        'old', CASE WHEN TG_OP <> 'INSERT' THEN to_jsonb(OLD) -> TG_ARGV[0] END,
+        'new', CASE WHEN TG_OP <> 'DELETE' THEN to_jsonb(NEW) - 'search' END
+    )::text);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+TRIGGERS = """
+CREATE TRIGGER mata_kuliah_reference_data
+    AFTER INSERT OR UPDATE OR DELETE ON mata_kuliah
+    FOR EACH ROW EXECUTE FUNCTION notify_reference_data('kode_mk');
+CREATE TRIGGER mata_kuliah_reference_data_truncate AFTER TRUNCATE ON mata_kuliah
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_reference_data();
+CREATE TRIGGER dosen_reference_data
+    AFTER INSERT OR UPDATE OR DELETE ON dosen
+    FOR EACH ROW EXECUTE FUNCTION notify_reference_data('nip');
+CREATE TRIGGER dosen_reference_data_truncate AFTER TRUNCATE ON dosen
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_reference_data();
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER dosen_reference_data_truncate ON dosen;
+DROP TRIGGER dosen_reference_data ON dosen;
+DROP TRIGGER mata_kuliah_reference_data_truncate ON mata_kuliah;
+DROP TRIGGER mata_kuliah_reference_data ON mata_kuliah;
+DROP FUNCTION notify_reference_data();
+"""
+
+
+def upgrade():
+    op.execute(FUNCTIONS)
+    op.execute(TRIGGERS)
+
+
+def downgrade():
+    op.execute(DROP_TRIGGERS)
@@ -0,0 +1,215 @@
+"""kelas_ampu_detail read model
+
+Revision ID: ff693da6c848
+Revises: 37c2387d269d
+Create Date: 2026-10-18 13:41:09.274410
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ff693da6c848'
+down_revision = '37c2387d269d'
+branch_labels = None
+depends_on = None
+
+
+# kelas_ampu_detail holds the registry already joined with mahasiswa, kelas, dosen
+# and mata_kuliah. Statement level triggers keep it in sync inside the writing
+# transaction, so a bulk write updates it with one set based statement.
+BACKFILL = """
+INSERT INTO kelas_ampu_detail
+    (kode_kelas, nim, nama_mhs, nama_kelas, hari, jam, nip, nama_dosen, kode_mk, nama_mk)
+SELECT kelas_ampu.kode_kelas, kelas_ampu.nim, mahasiswa.nama_mhs, kelas.nama_kelas,
+       kelas.hari, kelas.jam, kelas.nip, dosen.nama_dosen, kelas.kode_mk, mata_kuliah.nama_mk
+FROM kelas_ampu
+JOIN mahasiswa ON mahasiswa.nim = kelas_ampu.nim
+JOIN kelas ON kelas.kode_kelas = kelas_ampu.kode_kelas
+JOIN dosen ON dosen.nip = kelas.nip
+JOIN mata_kuliah ON mata_kuliah.kode_mk = kelas.kode_mk
+"""
+
+FUNCTIONS = """
+CREATE FUNCTION kelas_ampu_detail_insert() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO kelas_ampu_detail
+        (kode_kelas, nim, nama_mhs, nama_kelas, hari, jam, nip, nama_dosen, kode_mk, nama_mk)
+    SELECT new_rows.kode_kelas, new_rows.nim, mahasiswa.nama_mhs, kelas.nama_kelas,
+           kelas.hari, kelas.jam, kelas.nip, dosen.nama_dosen, kelas.kode_mk, mata_kuliah.nama_mk
+    FROM new_rows
+    JOIN mahasiswa ON mahasiswa.nim = new_rows.nim
+    JOIN kelas ON kelas.kode_kelas = new_rows.kode_kelas
+    JOIN dosen ON dosen.nip = kelas.nip
+    JOIN mata_kuliah ON mata_kuliah.kode_mk = kelas.kode_mk;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION kelas_ampu_detail_delete() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM kelas_ampu_detail
+    USING old_rows
+    WHERE kelas_ampu_detail.kode_kelas = old_rows.kode_kelas
+      AND kelas_ampu_detail.nim = old_rows.nim;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION kelas_ampu_detail_update() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM kelas_ampu_detail
+    USING old_rows
+    WHERE kelas_ampu_detail.kode_kelas = old_rows.kode_kelas
+      AND kelas_ampu_detail.nim = old_rows.nim;
+    INSERT INTO kelas_ampu_detail
+        (kode_kelas, nim, nama_mhs, nama_kelas, hari, jam, nip, nama_dosen, kode_mk, nama_mk)
+    SELECT new_rows.kode_kelas, new_rows.nim, mahasiswa.nama_mhs, kelas.nama_kelas,
+           kelas.hari, kelas.jam, kelas.nip, dosen.nama_dosen, kelas.kode_mk, mata_kuliah.nama_mk
+    FROM new_rows
+    JOIN mahasiswa ON mahasiswa.nim = new_rows.nim
+    JOIN kelas ON kelas.kode_kelas = new_rows.kode_kelas
+    JOIN dosen ON dosen.nip = kelas.nip
+    JOIN mata_kuliah ON mata_kuliah.kode_mk = kelas.kode_mk;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+-- only rewrite the detail rows when a column they copy has changed, the seat
+-- counter of kelas changes on every enrollment
+CREATE FUNCTION kelas_detail_update() RETURNS trigger AS $$
+BEGIN
+    UPDATE kelas_ampu_detail
+    SET nama_kelas = new_rows.nama_kelas, hari = new_rows.hari, jam = new_rows.jam,
+        nip = new_rows.nip, nama_dosen = dosen.nama_dosen,
+        kode_mk = new_rows.kode_mk, nama_mk = mata_kuliah.nama_mk
+    FROM new_rows
+    JOIN old_rows ON old_rows.kode_kelas = new_rows.kode_kelas
+    JOIN dosen ON dosen.nip = new_rows.nip
+    JOIN mata_kuliah ON mata_kuliah.kode_mk = new_rows.kode_mk
+    WHERE kelas_ampu_detail.kode_kelas = new_rows.kode_kelas
+      AND (new_rows.nama_kelas, new_rows.hari, new_rows.jam, new_rows.nip, new_rows.kode_mk)
+          IS DISTINCT FROM
+          (old_rows.nama_kelas, old_rows.hari, old_rows.jam, old_rows.nip, old_rows.kode_mk);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION dosen_detail_update() RETURNS trigger AS $$
+BEGIN
+    UPDATE kelas_ampu_detail SET nama_dosen = new_rows.nama_dosen
+    FROM new_rows JOIN old_rows ON old_rows.nip = new_rows.nip
+    WHERE kelas_ampu_detail.nip = new_rows.nip
+      AND new_rows.nama_dosen IS DISTINCT FROM old_rows.nama_dosen;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION mata_kuliah_detail_update() RETURNS trigger AS $$
+BEGIN
+    UPDATE kelas_ampu_detail SET nama_mk = new_rows.nama_mk
+    FROM new_rows JOIN old_rows ON old_rows.kode_mk = new_rows.kode_mk
+    WHERE kelas_ampu_detail.kode_mk = new_rows.kode_mk
+      AND new_rows.nama_mk IS DISTINCT FROM old_rows.nama_mk;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION mahasiswa_detail_update() RETURNS trigger AS $$
+BEGIN
+    UPDATE kelas_ampu_detail SET nama_mhs = new_rows.nama_mhs
+    FROM new_rows JOIN old_rows ON old_rows.nim = new_rows.nim
+    WHERE kelas_ampu_detail.nim = new_rows.nim
+      AND new_rows.nama_mhs IS DISTINCT FROM old_rows.nama_mhs;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+TRIGGERS = """
+CREATE TRIGGER kelas_ampu_detail_insert AFTER INSERT ON kelas_ampu
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kelas_ampu_detail_insert();
+CREATE TRIGGER kelas_ampu_detail_delete AFTER DELETE ON kelas_ampu
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kelas_ampu_detail_delete();
+CREATE TRIGGER kelas_ampu_detail_update AFTER UPDATE ON kelas_ampu
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kelas_ampu_detail_update();
+CREATE TRIGGER kelas_detail_update AFTER UPDATE ON kelas
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kelas_detail_update();
+CREATE TRIGGER dosen_detail_update AFTER UPDATE ON dosen
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dosen_detail_update();
+CREATE TRIGGER mata_kuliah_detail_update AFTER UPDATE ON mata_kuliah
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mata_kuliah_detail_update();
+CREATE TRIGGER mahasiswa_detail_update AFTER UPDATE ON mahasiswa
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mahasiswa_detail_update();
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER mahasiswa_detail_update ON mahasiswa;
+DROP TRIGGER mata_kuliah_detail_update ON mata_kuliah;
+DROP TRIGGER dosen_detail_update ON dosen;
+DROP TRIGGER kelas_detail_update ON kelas;
+DROP TRIGGER kelas_ampu_detail_update ON kelas_ampu;
+DROP TRIGGER kelas_ampu_detail_delete ON kelas_ampu;
+DROP TRIGGER kelas_ampu_detail_insert ON kelas_ampu;
+DROP FUNCTION mahasiswa_detail_update();
+DROP FUNCTION mata_kuliah_detail_update();
+DROP FUNCTION dosen_detail_update();
+DROP FUNCTION kelas_detail_update();
+DROP FUNCTION kelas_ampu_detail_update();
+DROP FUNCTION kelas_ampu_detail_delete();
+DROP FUNCTION kelas_ampu_detail_insert();
+"""
+
+
+def upgrade():
+    op.create_table('kelas_ampu_detail',
+    sa.Column('kode_kelas', sa.Integer(), nullable=False),
+    sa.Column('nim', sa.String(), nullable=False),
+    sa.Column('nama_mhs', sa.String(), nullable=False),
+    sa.Column('nama_kelas', sa.String(), nullable=False),
+    sa.Column('hari', sa.String(), nullable=False),
+    sa.Column('jam', sa.Time(), nullable=False),
+    sa.Column('nip', sa.String(), nullable=False),
+    sa.Column('nama_dosen', sa.String(), nullable=False),
+    sa.Column('kode_mk', sa.String(), nullable=False),
+    sa.Column('nama_mk', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('kode_kelas', 'nim')
+    )
+    with op.batch_alter_table('kelas_ampu_detail', schema=None) as batch_op:
+        # order of /searchregistry and the columns the triggers update by
+        batch_op.create_index('ix_kelas_ampu_detail_search_order', ['nim', sa.text('hari DESC'), 'jam', 'kode_kelas'], unique=False)
+        batch_op.create_index('ix_kelas_ampu_detail_nip', ['nip'], unique=False)
+        batch_op.create_index('ix_kelas_ampu_detail_kode_mk', ['kode_mk'], unique=False)
+        # trigram indexes for the substring filters of /searchregistry
+        batch_op.create_index('ix_kelas_ampu_detail_nim_trgm', ['nim'], unique=False, postgresql_using='gin', postgresql_ops={'nim': 'gin_trgm_ops'})
+        batch_op.create_index('ix_kelas_ampu_detail_nama_dosen_trgm', ['nama_dosen'], unique=False, postgresql_using='gin', postgresql_ops={'nama_dosen': 'gin_trgm_ops'})
+        batch_op.create_index('ix_kelas_ampu_detail_nama_mk_trgm', ['nama_mk'], unique=False, postgresql_using='gin', postgresql_ops={'nama_mk': 'gin_trgm_ops'})
+        batch_op.create_index('ix_kelas_ampu_detail_hari_trgm', ['hari'], unique=False, postgresql_using='gin', postgresql_ops={'hari': 'gin_trgm_ops'})
+
+    op.execute(BACKFILL)
+    op.execute(FUNCTIONS)
+    op.execute(TRIGGERS)
+
+    # /searchregistry reads only kelas_ampu_detail now, the trigram indexes of the
+    # base tables would only slow down their writes
+    op.drop_index('ix_kelas_hari_trgm', table_name='kelas')
+    op.drop_index('ix_mata_kuliah_nama_mk_trgm', table_name='mata_kuliah')
+    op.drop_index('ix_dosen_nama_dosen_trgm', table_name='dosen')
+    op.drop_index('ix_mahasiswa_nim_trgm', table_name='mahasiswa')
+
+
+def downgrade():
+    op.create_index('ix_mahasiswa_nim_trgm', 'mahasiswa', ['nim'], unique=False, postgresql_using='gin', postgresql_ops={'nim': 'gin_trgm_ops'})
+    op.create_index('ix_dosen_nama_dosen_trgm', 'dosen', ['nama_dosen'], unique=False, postgresql_using='gin', postgresql_ops={'nama_dosen': 'gin_trgm_ops'})
+    op.create_index('ix_mata_kuliah_nama_mk_trgm', 'mata_kuliah', ['nama_mk'], unique=False, postgresql_using='gin', postgresql_ops={'nama_mk': 'gin_trgm_ops'})
+    op.create_index('ix_kelas_hari_trgm', 'kelas', ['hari'], unique=False, postgresql_using='gin', postgresql_ops={'hari': 'gin_trgm_ops'})
+    op.execute(DROP_TRIGGERS)
+    op.drop_table('kelas_ampu_detail')
@@ -0,0 +1,168 @@
+import json
+import os
+import select
+import threading
+import time
+
+from sqlalchemy import column, table
+
+# REFERENCE DATA CACHE
+# rows of rarely changing tables (courses and lecturers) in the memory of every
+# worker process, by primary key. Row triggers on the tables NOTIFY the
+# reference_data channel of every insert, update and delete (see the reference_data
+# migration), a background thread of each process LISTENs on a connection of its
+# own and applies them, so every process follows the writes of all the others
+# within milliseconds and without polling. The tables are loaded in full whenever
+# the listener (re)connects, and the cache is only used while it listens, so
+# notifications missed while disconnected can never leave it stale.
+
+CHANNEL = "reference_data"
+
+
+class ReferenceCache:
+    # - tables maps a table name to its key column and the columns kept of a row
+    # - the listener checks its connection after idle seconds without notifications
+    #   and reconnects retry seconds after losing it
+    def __init__(self, tables, idle=10, retry=1):
+        self.tables = tables
+        self.idle = idle
+        self.retry = retry
+        self.engine = None
+        self.reset()
+        os.register_at_fork(after_in_child=self.reset)
+
+    # threads do not survive a fork, a forked worker drops what its parent loaded
+    # and starts a listener of its own on first use
+    def reset(self):
+        # table: {key: row}
+        self.rows = {table: {} for table in self.tables}
+        # table: number of times rows were removed from it, see store()
+        self.versions = {table: 0 for table in self.tables}
+        self.listening = threading.Event()
+        self.pid = None
+        self._lock = threading.Lock()
+        # held while the rows change
+        self._write_lock = threading.Lock()
+
+    def init_app(self, engine):
+        self.engine = engine
+
+    # whether the cache follows the database, starting the listener of the process
+    # on first use
+    def ready(self):
+        if self.pid != os.getpid():
+            self.start()
+        return self.listening.is_set()
+
+    def start(self):
+        with self._lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            if self.engine is None or self.engine.dialect.name != "postgresql":
+                return
+            threading.Thread(target=self.listen, daemon=True).start()
+
+    # the kept columns of a row, reading it from the database when its notification
+    # has not arrived yet (e.g. a course created by another worker a moment ago),
+    # returns None for a missing row without reading when read_through is False
+    def get(self, table, key, read_through=True):
+        row = self.rows[table].get(key)
+        if row is not None or key is None or not read_through:
+            return row
+        version = self.versions[table]
+        with self.engine.connect() as connection:
+            found = connection.execute(self.query(table, [key])).all()
+        if not found:
+            return None
+        self.store(table, found, version)
+        _, columns = self.tables[table]
+        return self.rows[table].get(key, dict(zip(columns, found[0][1:])))
+
+    # the keys of a table the cache has no row of, for the caller to read them with
+    # query() and store() them (e.g. with an async session)
+    def missing(self, table, keys):
+        rows = self.rows[table]
+        return list({key for key in keys if key is not None and key not in rows})
+
+    # the key and the kept columns of the rows of some keys of a table
+    def query(self, table_name, keys):
+        key_column, columns = self.tables[table_name]
+        key = column(key_column)
+        kept = table(table_name, key, *(column(name) for name in columns))
+        return kept.select().where(key.in_(keys))
+
+    # store rows of query() read when versions[table] was version. A notification
+    # applied in the meantime is newer than the read and wins, and nothing is stored
+    # when rows were removed since, the read may hold a row that is gone already.
+    def store(self, table, found, version):
+        _, columns = self.tables[table]
+        with self._write_lock:
+            if self.versions[table] != version:
+                return
+            rows = self.rows[table]
+            for key, *values in found:
+                rows.setdefault(key, dict(zip(columns, values)))
+
+    def load(self, cursor):
+        rows = {}
+        for table, (key_column, columns) in self.tables.items():
+            cursor.execute(f"SELECT {key_column}, {', '.join(columns)} FROM {table}")
+            rows[table] = {
+                key: dict(zip(columns, values)) for key, *values in cursor.fetchall()
+            }
+        with self._write_lock:
+            self.rows = rows
+            for table in self.versions:
+                self.versions[table] += 1
+
+    # apply a notification: {"table", "op", "old" (key), "new" (row)}
+    def apply(self, payload):
+        event = json.loads(payload)
+        table = event["table"]
+        if table not in self.tables:
+            return
+        key_column, columns = self.tables[table]
+        new = event["new"]
+        with self._write_lock:
+            rows = self.rows[table]
+            if event["op"] == "TRUNCATE":
+                rows.clear()
+                self.versions[table] += 1
+                return
+            if event["old"] is not None:
+                rows.pop(event["old"], None)
+                if new is None or new[key_column] != event["old"]:
+                    self.versions[table] += 1
+            if new is not None:
+                rows[new[key_column]] = {column: new[column] for column in columns}
+
+    def listen(self):
+        while True:
+            connection = None
+            try:
+                # a connection of its own, it would take a slot of the pool for good
+                connection = self.engine.raw_connection()
+                connection.detach()
+                dbapi_connection = connection.dbapi_connection
+                dbapi_connection.autocommit = True
+                cursor = dbapi_connection.cursor()
+                # listen before loading, a write committed during the load is then
+                # applied on top of it
+                cursor.execute(f"LISTEN {CHANNEL}")
+                self.load(cursor)
+                self.listening.set()
+                while True:
+                    if not select.select([dbapi_connection], [], [], self.idle)[0]:
+                        cursor.execute("SELECT 1")
+                    dbapi_connection.poll()
+                    while dbapi_connection.notifies:
+                        self.apply(dbapi_connection.notifies.pop(0).payload)
+            except Exception:
+                self.listening.clear()
+                if connection is not None:
+                    connection.close()
+                time.sleep(self.retry)
+
+    def stats(self):
+        return {(table,): len(rows) for table, rows in self.rows.items()}
@@ -0,0 +1,158 @@
+import contextlib
+import itertools
+import threading
+import time
+
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+
+# READ REPLICAS
+# the sessions of read-only requests (GET and HEAD) read from replica engines,
+# chosen round-robin, everything else goes to the primary. A session keeps using
+# the primary once it has written, so a request reads its own writes even after
+# the commit, and a replica that fails its health check is skipped until it passes
+# again, falling back to the primary when none is healthy. Reads whose results
+# outlive the request (process caches) go to the primary, see primary_reads().
+
+READ_METHODS = {"GET", "HEAD"}
+
+# replication lag of a Postgres standby in seconds, 0 when it has replayed all it
+# received and NULL on a server that is not a standby
+LAG_QUERY = """SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+END"""
+
+
+class ReplicaSet:
+    # - engines maps the bind key of every replica to its engine
+    # - a replica is checked again once its last check is check_interval seconds
+    #   old, and counts as down while it lags more than max_lag seconds behind
+    def __init__(self, engines, check_interval=10, max_lag=None):
+        self.engines = engines
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        # bind key: (healthy, monotonic time of the check)
+        self.status = {}
+        self._cycle = itertools.cycle(list(engines))
+        self._lock = threading.Lock()
+
+        for key, engine in engines.items():
+            event.listen(engine, "handle_error", self._on_error(key))
+
+    # a replica that loses its connection mid request is down until checked again
+    def _on_error(self, key):
+        def handle_error(context):
+            if context.is_disconnect or context.connection is None:
+                self.mark(key, False)
+
+        return handle_error
+
+    def mark(self, key, healthy):
+        with self._lock:
+            self.status[key] = (healthy, time.monotonic())
+
+    def check(self, key):
+        engine = self.engines[key]
+        try:
+            with engine.connect() as connection:
+                if engine.dialect.name == "postgresql" and self.max_lag is not None:
+                    lag = connection.execute(text(LAG_QUERY)).scalar()
+                    healthy = lag is None or lag <= self.max_lag
+                else:
+                    connection.execute(text("SELECT 1"))
+                    healthy = True
+        except Exception:
+            healthy = False
+        self.mark(key, healthy)
+        return healthy
+
+    def is_healthy(self, key):
+        healthy, checked_at = self.status.get(key, (False, None))
+        if checked_at is None or time.monotonic() - checked_at > self.check_interval:
+            return self.check(key)
+        return healthy
+
+    # the engine of the next healthy replica, or None to use the primary
+    def choose(self):
+        for _ in range(len(self.engines)):
+            with self._lock:
+                key = next(self._cycle)
+            if self.is_healthy(key):
+                return self.engines[key]
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {key: healthy for key, (healthy, _) in self.status.items()}
+
+
+# session of Flask-SQLAlchemy that routes reads as described above, the replica
+# set is taken from app.extensions["replicas"]
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        primary = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or primary is not self._db.engines.get(None):
+            return primary
+        if self._flushing or getattr(clause, "is_dml", False):
+            self.info["wrote"] = True
+        if not self.reads_replica():
+            return primary
+
+        # stay on one replica for the whole session, so a request sees one snapshot
+        if "replica" not in self.info:
+            self.info["replica"] = current_app.extensions["replicas"].choose()
+        return self.info["replica"] or primary
+
+    def reads_replica(self):
+        return (
+            has_request_context()
+            and request.method in READ_METHODS
+            and not self.info.get("wrote")
+            and not self.info.get("primary_reads")
+            and current_app.extensions.get("replicas") is not None
+        )
+
+
+    # whether the session read anything from a replica so far
+    def used_replica(self):
+        return self.info.get("replica") is not None
+
+
+# read from the primary inside the block, for results that are cached longer than a
+# replica may lag behind, which a replica read would keep stale until they expire
+@contextlib.contextmanager
+def primary_reads(session):
+    nested = session.info.get("primary_reads", False)
+    session.info["primary_reads"] = True
+    try:
+        yield
+    finally:
+        session.info["primary_reads"] = nested
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def note_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or (
+        orm_execute_state.is_delete
+    ):
+        orm_execute_state.session.info["wrote"] = True
+
+
+# the bind keys of the replicas configured in SQLALCHEMY_BINDS
+def replica_binds(urls):
+    return {f"replica_{index}": url for index, url in enumerate(urls)}
+
+
+def init_app(app, db, urls):
+    app.extensions["replicas"] = None
+    if not urls:
+        return
+    with app.app_context():
+        engines = {key: db.engines[key] for key in replica_binds(urls)}
+    app.extensions["replicas"] = ReplicaSet(
+        engines,
+        check_interval=app.config.get("REPLICA_CHECK_INTERVAL", 10),
+        max_lag=app.config.get("REPLICA_MAX_LAG"),
+    )
@@ -0,0 +1,110 @@
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+from app import create_app
+
+# PREFORK LAUNCHER, NOT FOR PRODUCTION
+# usage: python serve.py --workers 4 --port 8000
+#
+# the parent builds the app and binds the socket, then forks the worker processes
+# that accept connections on it, each handling a request per thread. Every worker
+# drops the pooled connections it inherited and opens its own (see after_fork() in
+# app.py), so a connection is never shared between workers. A worker that dies is
+# replaced, SIGTERM or SIGINT stops the workers after their current requests.
+#
+# the workers run the Werkzeug development server, which is fine for development and
+# the benchmarks but not hardened for the internet. In production run the app with
+# gunicorn, which forks its workers the same way:
+#     gunicorn "app:create_app()" --workers 4
+
+# a worker dying sooner than this after its start is replaced only after a pause, so
+# that a worker crashing on start does not fork in a loop
+RESPAWN_DELAY = 1
+
+
+def serve(app, sock):
+    host, port = sock.getsockname()[:2]
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+
+    # shutdown() waits for serve_forever() to return, so it runs in another thread
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    server.serve_forever()
+
+
+def spawn(app, sock):
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            serve(app, sock)
+        except BaseException:
+            code = 1
+            raise
+        finally:
+            os._exit(code)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python serve.py",
+        description="prefork development server, use gunicorn in production",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    app = create_app()
+    sock = socket.create_server((args.host, args.port), backlog=2048)
+    sock.set_inheritable(True)
+
+    workers = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(args.workers):
+        workers[spawn(app, sock)] = time.monotonic()
+    print(
+        f"serving on http://{args.host}:{args.port} with {args.workers} workers",
+        "(development server, use gunicorn in production)",
+        file=sys.stderr,
+    )
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = workers.pop(pid, None)
+        if started is None or stopping:
+            continue
+        print(f"worker {pid} exited ({status}), replacing it", file=sys.stderr)
+        if time.monotonic() - started < RESPAWN_DELAY:
+            time.sleep(RESPAWN_DELAY)
+        if not stopping:
+            workers[spawn(app, sock)] = time.monotonic()
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()